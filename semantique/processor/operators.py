@@ -1,11 +1,253 @@
+import geopandas as gpd
 import pandas as pd
 import numpy as np
+import shapely
 import xarray as xr
 
+from functools import partial
 from semantique.processor import utils
 from semantique.processor.types import TypePromoter
 from semantique.processor.values import Interval
-from semantique.dimensions import SPACE
+from semantique.dimensions import SPACE, X, Y
+
+#
+# HELPERS
+#
+
+def _apply(f, x, *args):
+  """Apply an element-wise kernel to one or more operands.
+
+  Calling :func:`xarray.apply_ufunc` carries a fixed overhead for aligning
+  and broadcasting its inputs. When all array operands are already aligned
+  with ``x`` and none of them are backed by dask, the kernel is instead called
+  directly on the underlying numpy arrays. Dask-backed operands are processed
+  lazily, chunk by chunk.
+
+  Floating point errors inside the kernel, such as the square root of a
+  negative number or an overflow, are ignored instead of emitting warnings.
+  They produce NaN or infinite values, which operators handle as results.
+
+  Parameters
+  ----------
+    f : :obj:`callable`
+      The kernel to apply. Receives the values of all operands.
+    x : :obj:`xarray.DataArray`
+      The first operand. The output has the same structure as this array.
+    *args:
+      Additional operands.
+
+  Returns
+  -------
+    :obj:`xarray.DataArray`
+
+  """
+  arrays = [a for a in args if isinstance(a, xr.DataArray)]
+  chunked = _is_chunked(x) or any(_is_chunked(a) for a in arrays)
+  if not chunked and all(_is_aligned(a, x) for a in arrays):
+    args = [_compact(a.data) if isinstance(a, xr.DataArray) else a for a in args]
+    with np.errstate(all = "ignore"):
+      values = f(x.data, *args)
+    return x.copy(deep = False, data = values)
+  # Only array operands are passed on to xarray. Other operands, like sets or
+  # intervals, are bound to the kernel. Otherwise dask would try to chunk them.
+  idx = [i for i, a in enumerate(args) if isinstance(a, xr.DataArray)]
+  def g(x, *values):
+    operands = list(args)
+    for i, v in zip(idx, values):
+      operands[i] = v
+    with np.errstate(all = "ignore"):
+      return f(x, *operands)
+  return xr.apply_ufunc(g, x, *arrays, keep_attrs = True, dask = "parallelized")
+
+def _masked(op, x, *args, mask = None):
+  # Generic kernel that evaluates op and assigns nodata where x is missing.
+  # Being defined at module level it is shared by all operators that use it.
+  return _fill_nodata(op(x, *args), x, mask = mask)
+
+def _align(y, x):
+  # Aligns operand y with x. Scalars do not need alignment. They are passed on
+  # as zero-dimensional arrays, which numpy broadcasts inside the kernel. The
+  # conversion to an array keeps type promotion the same as for array operands.
+  if not isinstance(y, xr.DataArray) and np.ndim(y) == 0:
+    # Plain numbers adopt the precision of float arrays, as they would in numpy.
+    # This avoids promoting e.g. float32 data to float64 by a constant operand.
+    # Numbers that do not fit into the precision of x keep their own.
+    if x.dtype.kind == "f" and type(y) in (int, float):
+      with np.errstate(over = "ignore"):
+        value = np.asarray(y, dtype = x.dtype)
+      if np.isfinite(value) or not np.isfinite(y):
+        return value
+    return np.asarray(y)
+  if isinstance(y, xr.DataArray) and y.ndim == 0:
+    # Zero-dimensional arrays, e.g. from reducing over all dimensions, are
+    # constants as well. Only dask-backed ones still go through alignment.
+    if not (_is_chunked(y) or _is_chunked(x)):
+      return y.data
+  # Operands that are already aligned, e.g. because they were derived from the
+  # same array as x, are returned as they are. Aligning them would be a no-op,
+  # but it takes much longer than most kernels.
+  if isinstance(y, xr.DataArray) and _is_aligned(y, x):
+    return y
+  return xr.DataArray(y).sq.align_with(x)
+
+def _fill_nodata(values, x, mask = None):
+  # Assigns nodata to the values where x is missing. Boolean and integer
+  # arrays cannot contain missing values. Their results are only converted
+  # to floats, without masking, such that they have the same numeric dtype
+  # as results that may contain missing values. Reducers and arithmetic
+  # operators applied to them afterwards do not all support booleans.
+  # A precomputed mask of non-null values in x can be given to avoid another
+  # pass over x. It is ignored if it does not match the values passed in.
+  if x.dtype.kind in ["b", "i", "u"]:
+    return np.asarray(values, dtype = np.float64)
+  if mask is None or np.shape(mask) != np.shape(x):
+    mask = utils.notnull(x)
+  return np.where(mask, values, _nodata(x))
+
+def _nodata(x):
+  # Missing values are stored as NaN. Floating point arrays keep their own
+  # precision, such that e.g. float32 inputs do not produce float64 outputs.
+  return x.dtype.type(np.nan) if x.dtype.kind == "f" else np.nan
+
+def _divide(x, y):
+  # Division by zero returns NaN. The quotient is evaluated everywhere, after
+  # which the elements with a zero denominator are overwritten in place. This
+  # is faster than a masked division into an array prefilled with NaN.
+  shape = np.broadcast_shapes(np.shape(x), np.shape(y))
+  dtype = np.result_type(x, np.result_type(y, np.nan))
+  out = np.empty(shape, dtype = dtype)
+  np.divide(x, y, out = out)
+  np.copyto(out, np.nan, where = np.equal(y, 0))
+  return out
+
+def _normalized_difference(x, y):
+  # The quotient is written into the array holding the differences, such that
+  # no third array of the full size is allocated. This is only possible when
+  # that array has the dtype of the quotient, e.g. not for integer operands.
+  difference = np.subtract(x, y)
+  total = np.add(x, y)
+  if isinstance(difference, np.ndarray) and difference.dtype.kind == "f":
+    if np.result_type(difference, total) == difference.dtype:
+      return np.divide(difference, total, out = difference)
+  return np.divide(difference, total)
+
+def _convert_angle(f, factor, x):
+  # Multiplying by the conversion factor is much faster than np.rad2deg and
+  # np.deg2rad, which are not vectorized. For double precision floats the
+  # results are identical. Other dtypes use f, which rounds differently.
+  if x.dtype == np.float64:
+    return np.multiply(x, factor)
+  return f(x)
+
+def _bounds(y):
+  # Returns the lower and upper bound of a set of time instants. These are
+  # computed once, before applying the kernel, such that they are not
+  # recomputed for every chunk of a dask-backed array.
+  if isinstance(y, xr.DataArray):
+    y = y.values
+  return np.nanmin(y), np.nanmax(y)
+
+def _logical_not(x):
+  # For numbers, testing for equality with zero gives the same result as
+  # np.logical_not, but is vectorized and hence much faster.
+  if x.dtype.kind in ["i", "u", "f"]:
+    return np.equal(x, 0)
+  return np.logical_not(x)
+
+def _masked_logical(op, x, y, mask = None):
+  # Missing values in y are treated as false in boolean operators.
+  # Numbers are converted to booleans before applying op, since the logical
+  # ufuncs are not vectorized for numbers while comparisons with zero are.
+  # Where x is missing the result is overwritten with nodata anyway.
+  return _fill_nodata(op(_truth(x), _null_as_false(y)), x, mask = mask)
+
+def _truth(x):
+  # Truth value of each element, as np.logical_and and friends would see it.
+  if x.dtype.kind in ["i", "u", "f"]:
+    return np.not_equal(x, 0)
+  return x
+
+def _null_as_false(y):
+  # Truth value of each element, with missing values being false. For floats
+  # this combines two comparisons instead of replacing NaN by zero first.
+  if y.dtype.kind == "f":
+    values = np.not_equal(y, 0)
+    values &= np.equal(y, y)
+    return values
+  if y.dtype.kind in ["b", "i", "u"]:
+    return _truth(y)
+  return utils.null_as_zero(y)
+
+def _notnull_mask(x):
+  # Mask of non-null values in x, computed once per operator call. It is not
+  # cached on the array, since arrays may be modified in place afterwards.
+  # Dask-backed arrays are masked chunk by chunk instead.
+  # Boolean and integer arrays are not masked at all, see _fill_nodata.
+  if _is_chunked(x) or x.dtype.kind in ["b", "i", "u"]:
+    return None
+  return utils.notnull(x.data)
+
+def _constant(x, y):
+  # Returns y as float if it is a constant that does not change the data type
+  # of x when combined with it. Returns None otherwise.
+  if np.ndim(y) != 0 or x.dtype.kind not in "iuf":
+    return None
+  try:
+    if np.result_type(x.dtype, np.asarray(y)) != x.dtype:
+      return None
+    return float(y)
+  except (TypeError, ValueError):
+    return None
+
+def _small_exponent(x, y):
+  # Returns y as integer if it is a constant exponent between 2 and 4 that
+  # does not change the data type of x. Returns None otherwise.
+  n = _constant(x, y)
+  if n is None or not n.is_integer() or not 2 <= n <= 4:
+    return None
+  return int(n)
+
+def _is_chunked(x):
+  # Checking the type of the data first is much faster than accessing chunks,
+  # which tests the data against a protocol. Most arrays are numpy-backed.
+  return not isinstance(x.data, np.ndarray) and x.chunks is not None
+
+def _is_aligned(a, b):
+  if a.dims != b.dims or a.shape != b.shape:
+    return False
+  if a.indexes.keys() != b.indexes.keys():
+    return False
+  return all(a.indexes[k].equals(b.indexes[k]) for k in a.indexes)
+
+def _compact(values):
+  # Operands aligned to x are often broadcasted views with zero strides.
+  # Keeping the broadcasted dimensions at size 1 lets numpy broadcast them
+  # inside the kernel, instead of computing intermediates at full size.
+  strides = getattr(values, "strides", None)
+  if not strides or 0 not in strides:
+    return values
+  return values[tuple(slice(0, 1) if s == 0 else slice(None) for s in strides)]
+
+def _intersects_grid(geoms, xcoords, ycoords):
+  # Tests for each point of a grid if it intersects with any of the geometries.
+  # Each geometry is only tested against the grid points within its bounding
+  # box, using their coordinates directly. Creating point geometries for all
+  # grid points is avoided, since that is by far the most expensive part.
+  # Returns a boolean array with the y coordinates along the first axis.
+  out = np.zeros((len(ycoords), len(xcoords)), dtype = bool)
+  xorder = np.argsort(xcoords)
+  yorder = np.argsort(ycoords)
+  bounds = shapely.bounds(geoms)
+  x0 = np.searchsorted(xcoords[xorder], bounds[:, 0], side = "left")
+  x1 = np.searchsorted(xcoords[xorder], bounds[:, 2], side = "right")
+  y0 = np.searchsorted(ycoords[yorder], bounds[:, 1], side = "left")
+  y1 = np.searchsorted(ycoords[yorder], bounds[:, 3], side = "right")
+  for i in np.flatnonzero((x1 > x0) & (y1 > y0)):
+    xidx = xorder[x0[i]:x1[i]]
+    yidx = yorder[y0[i]:y1[i]]
+    xy = (xcoords[xidx][np.newaxis, :], ycoords[yidx][:, np.newaxis])
+    out[np.ix_(yidx, xidx)] |= shapely.intersects_xy(geoms[i], *xy)
+  return out
 
 #
 # UNIVARIATE OPERATORS
@@ -48,8 +290,8 @@ def not_(x, track_types = True, **kwargs):
   if track_types:
     promoter = TypePromoter(x, function = "not")
     promoter.check()
-  f = lambda x: np.where(pd.notnull(x), np.logical_not(x), np.nan)
-  out = xr.apply_ufunc(f, x, keep_attrs = True)
+  f = partial(_masked, _logical_not, mask = _notnull_mask(x))
+  out = _apply(f, x)
   if track_types:
     out = promoter.promote(out)
   return out
@@ -104,8 +346,7 @@ def is_missing_(x, track_types = True, **kwargs):
   if track_types:
     promoter = TypePromoter(x, function = "is_missing")
     promoter.check()
-  f = lambda x: pd.isnull(x)
-  out = xr.apply_ufunc(f, x, keep_attrs = True)
+  out = _apply(utils.isnull, x)
   if track_types:
     out = promoter.promote(out)
   return out
@@ -147,8 +388,7 @@ def not_missing_(x, track_types = True, **kwargs):
   if track_types:
     promoter = TypePromoter(x, function = "not_missing")
     promoter.check()
-  f = lambda x: pd.notnull(x)
-  out = xr.apply_ufunc(f, x, keep_attrs = True)
+  out = _apply(utils.notnull, x)
   if track_types:
     out = promoter.promote(out)
   return out
@@ -190,8 +430,10 @@ def absolute_(x, track_types = True, **kwargs):
   if track_types:
     promoter = TypePromoter(x, function = "absolute")
     promoter.check()
-  f = lambda x: np.absolute(x)
-  out = xr.apply_ufunc(f, x, keep_attrs = True)
+  # Booleans and unsigned integers are never negative. Copying them is cheaper
+  # than evaluating their absolute value.
+  f = np.copy if x.dtype.kind in ["b", "u"] else np.absolute
+  out = _apply(f, x)
   if track_types:
     out = promoter.promote(out)
   return out
@@ -235,8 +477,7 @@ def ceiling_(x, track_types = True, **kwargs):
   if track_types:
     promoter = TypePromoter(x, function = "ceiling")
     promoter.check()
-  f = lambda x: np.ceil(x)
-  out = xr.apply_ufunc(f, x, keep_attrs = True)
+  out = _apply(np.ceil, x)
   if track_types:
     out = promoter.promote(out)
   return out
@@ -280,8 +521,7 @@ def cosine_(x, track_types = True, **kwargs):
   if track_types:
     promoter = TypePromoter(x, function = "cosine")
     promoter.check()
-  f = lambda x: np.cos(x)
-  out = xr.apply_ufunc(f, x, keep_attrs = True)
+  out = _apply(np.cos, x)
   if track_types:
     out = promoter.promote(out)
   return out
@@ -325,11 +565,8 @@ def cosecant_(x, track_types = True, **kwargs):
   if track_types:
     promoter = TypePromoter(x, function = "cosecant")
     promoter.check()
-  def f(x):
-    sin = np.sin(x)
-    sin_nozero = np.where(np.equal(sin, 0), np.nan, sin)
-    return np.divide(1, sin_nozero)
-  out = xr.apply_ufunc(f, x, keep_attrs = True)
+  f = lambda x: _divide(1, np.sin(x))
+  out = _apply(f, x)
   if track_types:
     out = promoter.promote(out)
   return out
@@ -373,11 +610,8 @@ def cotangent_(x, track_types = True, **kwargs):
   if track_types:
     promoter = TypePromoter(x, function = "cotangent")
     promoter.check()
-  def f(x):
-    tan = np.tan(x)
-    tan_nozero = np.where(np.equal(tan, 0), np.nan, tan)
-    return np.divide(1, tan_nozero)
-  out = xr.apply_ufunc(f, x, keep_attrs = True)
+  f = lambda x: _divide(1, np.tan(x))
+  out = _apply(f, x)
   if track_types:
     out = promoter.promote(out)
   return out
@@ -419,8 +653,7 @@ def cube_root_(x, track_types = True, **kwargs):
   if track_types:
     promoter = TypePromoter(x, function = "cube_root")
     promoter.check()
-  f = lambda x: np.cbrt(x)
-  out = xr.apply_ufunc(f, x, keep_attrs = True)
+  out = _apply(np.cbrt, x)
   if track_types:
     out = promoter.promote(out)
   return out
@@ -466,8 +699,7 @@ def exponential_(x, track_types = True, **kwargs):
   if track_types:
     promoter = TypePromoter(x, function = "exponential")
     promoter.check()
-  f = lambda x: np.exp(x)
-  out = xr.apply_ufunc(f, x, keep_attrs = True)
+  out = _apply(np.exp, x)
   if track_types:
     out = promoter.promote(out)
   return out
@@ -511,8 +743,7 @@ def floor_(x, track_types = True, **kwargs):
   if track_types:
     promoter = TypePromoter(x, function = "floor")
     promoter.check()
-  f = lambda x: np.floor(x)
-  out = xr.apply_ufunc(f, x, keep_attrs = True)
+  out = _apply(np.floor, x)
   if track_types:
     out = promoter.promote(out)
   return out
@@ -558,8 +789,13 @@ def natural_logarithm_(x, track_types = True, **kwargs):
   if track_types:
     promoter = TypePromoter(x, function = "natural_logarithm")
     promoter.check()
-  f = lambda x: np.where(np.equal(x, 0), np.nan, np.log(x))
-  out = xr.apply_ufunc(f, x, keep_attrs = True)
+  def f(x):
+    # The logarithm of zero is overwritten in place instead of selecting
+    # between the logarithm and NaN, which would allocate another array.
+    values = np.asarray(np.log(x))
+    np.copyto(values, np.nan, where = np.equal(x, 0))
+    return values
+  out = _apply(f, x)
   if track_types:
     out = promoter.promote(out)
   return out
@@ -603,11 +839,8 @@ def secant_(x, track_types = True, **kwargs):
   if track_types:
     promoter = TypePromoter(x, function = "secant")
     promoter.check()
-  def f(x):
-    cos = np.cos(x)
-    cos_nozero = np.where(np.equal(cos, 0), np.nan, cos)
-    return np.divide(1, cos_nozero)
-  out = xr.apply_ufunc(f, x, keep_attrs = True)
+  f = lambda x: _divide(1, np.cos(x))
+  out = _apply(f, x)
   if track_types:
     out = promoter.promote(out)
   return out
@@ -651,8 +884,7 @@ def sine_(x, track_types = True, **kwargs):
   if track_types:
     promoter = TypePromoter(x, function = "sine")
     promoter.check()
-  f = lambda x: np.sin(x)
-  out = xr.apply_ufunc(f, x, keep_attrs = True)
+  out = _apply(np.sin, x)
   if track_types:
     out = promoter.promote(out)
   return out
@@ -694,8 +926,7 @@ def square_root_(x, track_types = True, **kwargs):
   if track_types:
     promoter = TypePromoter(x, function = "square_root")
     promoter.check()
-  f = lambda x: np.sqrt(x)
-  out = xr.apply_ufunc(f, x, keep_attrs = True)
+  out = _apply(np.sqrt, x)
   if track_types:
     out = promoter.promote(out)
   return out
@@ -739,8 +970,7 @@ def tangent_(x, track_types = True, **kwargs):
   if track_types:
     promoter = TypePromoter(x, function = "tangent")
     promoter.check()
-  f = lambda x: np.tan(x)
-  out = xr.apply_ufunc(f, x, keep_attrs = True)
+  out = _apply(np.tan, x)
   if track_types:
     out = promoter.promote(out)
   return out
@@ -784,8 +1014,7 @@ def to_degrees_(x, track_types = True, **kwargs):
   if track_types:
     promoter = TypePromoter(x, function = "to_degrees")
     promoter.check()
-  f = lambda x: np.rad2deg(x)
-  out = xr.apply_ufunc(f, x, keep_attrs = True)
+  out = _apply(partial(_convert_angle, np.rad2deg, 180 / np.pi), x)
   if track_types:
     out = promoter.promote(out)
   return out
@@ -829,8 +1058,7 @@ def to_radians_(x, track_types = True, **kwargs):
   if track_types:
     promoter = TypePromoter(x, function = "to_radians")
     promoter.check()
-  f = lambda x: np.deg2rad(x)
-  out = xr.apply_ufunc(f, x, keep_attrs = True)
+  out = _apply(partial(_convert_angle, np.deg2rad, np.pi / 180), x)
   if track_types:
     out = promoter.promote(out)
   return out
@@ -886,9 +1114,18 @@ def add_(x, y, track_types = True, **kwargs):
   if track_types:
     promoter = TypePromoter(x, y, function = "add")
     promoter.check()
-  f = lambda x, y: np.add(x, y)
-  y = xr.DataArray(y).sq.align_with(x)
-  out = xr.apply_ufunc(f, x, y, keep_attrs = True)
+  def f(x, y):
+    # Numpy adds booleans with a logical or, but binary values should be summed.
+    # This only happens when both operands are boolean. Otherwise numpy already
+    # sums them, in the dtype of the other operand.
+    if x.dtype.kind == "b" and np.result_type(y).kind == "b":
+      x = x.astype(int)
+    return np.add(x, y)
+  if _constant(x, y) == 0:
+    out = _apply(np.copy, x)
+  else:
+    y = _align(y, x)
+    out = _apply(f, x, y)
   if track_types:
     out = promoter.promote(out)
   return out
@@ -940,9 +1177,13 @@ def divide_(x, y, track_types = True, **kwargs):
   if track_types:
     promoter = TypePromoter(x, y, function = "divide")
     promoter.check()
-  f = lambda x, y: np.divide(x, np.where(np.equal(y, 0), np.nan, y))
-  y = xr.DataArray(y).sq.align_with(x)
-  out = xr.apply_ufunc(f, x, y, keep_attrs = True)
+  f = _divide
+  # Division always returns double precision floats.
+  if x.dtype == np.float64 and _constant(x, y) == 1:
+    out = _apply(np.copy, x)
+  else:
+    y = _align(y, x)
+    out = _apply(f, x, y)
   if track_types:
     out = promoter.promote(out)
   return out
@@ -994,9 +1235,12 @@ def multiply_(x, y, track_types = True, **kwargs):
   if track_types:
     promoter = TypePromoter(x, y, function = "multiply")
     promoter.check()
-  f = lambda x, y: np.multiply(x, y)
-  y = xr.DataArray(y).sq.align_with(x)
-  out = xr.apply_ufunc(f, x, y, keep_attrs = True)
+  f = np.multiply
+  if _constant(x, y) == 1:
+    out = _apply(np.copy, x)
+  else:
+    y = _align(y, x)
+    out = _apply(f, x, y)
   if track_types:
     out = promoter.promote(out)
   return out
@@ -1048,9 +1292,25 @@ def power_(x, y, track_types = True, **kwargs):
   if track_types:
     promoter = TypePromoter(x, y, function = "power")
     promoter.check()
-  f = lambda x, y: np.power(x, y)
-  y = xr.DataArray(y).sq.align_with(x)
-  out = xr.apply_ufunc(f, x, y, keep_attrs = True)
+  n = _small_exponent(x, y)
+  if _constant(x, y) == 1:
+    out = _apply(np.copy, x)
+  elif _constant(x, y) == 0:
+    # Any value to the power of zero is one, including NaN.
+    out = _apply(np.ones_like, x)
+  elif n is None:
+    f = np.power
+    y = _align(y, x)
+    out = _apply(f, x, y)
+  else:
+    # Small integer powers are computed by repeated multiplication.
+    # This is much cheaper than evaluating the generic power function.
+    def f(x):
+      values = np.multiply(x, x)
+      for _ in range(n - 2):
+        np.multiply(values, x, out = values)
+      return values
+    out = _apply(f, x)
   if track_types:
     out = promoter.promote(out)
   return out
@@ -1102,9 +1362,12 @@ def subtract_(x, y, track_types = True, **kwargs):
   if track_types:
     promoter = TypePromoter(x, y, function = "subtract")
     promoter.check()
-  f = lambda x, y: np.subtract(x, y)
-  y = xr.DataArray(y).sq.align_with(x)
-  out = xr.apply_ufunc(f, x, y, keep_attrs = True)
+  f = np.subtract
+  if _constant(x, y) == 0:
+    out = _apply(np.copy, x)
+  else:
+    y = _align(y, x)
+    out = _apply(f, x, y)
   if track_types:
     out = promoter.promote(out)
   return out
@@ -1160,9 +1423,8 @@ def normalized_difference_(x, y, track_types = True, **kwargs):
   if track_types:
     promoter = TypePromoter(x, y, function = "normalized_difference")
     promoter.check()
-  f = lambda x, y: np.divide(np.subtract(x, y), np.add(x, y))
-  y = xr.DataArray(y).sq.align_with(x)
-  out = xr.apply_ufunc(f, x, y, keep_attrs = True)
+  y = _align(y, x)
+  out = _apply(_normalized_difference, x, y)
   if track_types:
     out = promoter.promote(out)
   return out
@@ -1218,11 +1480,9 @@ def and_(x, y, track_types = True, **kwargs):
   if track_types:
     promoter = TypePromoter(x, y, function = "and")
     promoter.check()
-  def f(x, y):
-    y = utils.null_as_zero(y)
-    return np.where(pd.notnull(x), np.logical_and(x, y), np.nan)
-  y = xr.DataArray(y).sq.align_with(x)
-  out = xr.apply_ufunc(f, x, y, keep_attrs = True)
+  f = partial(_masked_logical, np.logical_and, mask = _notnull_mask(x))
+  y = _align(y, x)
+  out = _apply(f, x, y)
   if track_types:
     out = promoter.promote(out)
   return out
@@ -1281,11 +1541,9 @@ def or_(x, y, track_types = True, **kwargs):
   if track_types:
     promoter = TypePromoter(x, y, function = "or")
     promoter.check()
-  def f(x, y):
-    y = utils.null_as_zero(y)
-    return np.where(pd.notnull(x), np.logical_or(x, y), np.nan)
-  y = xr.DataArray(y).sq.align_with(x)
-  out = xr.apply_ufunc(f, x, y, keep_attrs = True)
+  f = partial(_masked_logical, np.logical_or, mask = _notnull_mask(x))
+  y = _align(y, x)
+  out = _apply(f, x, y)
   if track_types:
     out = promoter.promote(out)
   return out
@@ -1344,11 +1602,9 @@ def exclusive_or_(x, y, track_types = True, **kwargs):
   if track_types:
     promoter = TypePromoter(x, y, function = "exclusive_or")
     promoter.check()
-  def f(x, y):
-    y = utils.null_as_zero(y)
-    return np.where(pd.notnull(x), np.logical_xor(x, y), np.nan)
-  y = xr.DataArray(y).sq.align_with(x)
-  out = xr.apply_ufunc(f, x, y, keep_attrs = True)
+  f = partial(_masked_logical, np.logical_xor, mask = _notnull_mask(x))
+  y = _align(y, x)
+  out = _apply(f, x, y)
   if track_types:
     out = promoter.promote(out)
   return out
@@ -1404,9 +1660,9 @@ def equal_(x, y, track_types = True, **kwargs):
   if track_types:
     promoter = TypePromoter(x, y, function = "equal")
     promoter.check()
-  f = lambda x, y: np.where(pd.notnull(x), np.equal(x, y), np.nan)
-  y = xr.DataArray(y).sq.align_with(x)
-  out = xr.apply_ufunc(f, x, y, keep_attrs = True)
+  f = partial(_masked, np.equal, mask = _notnull_mask(x))
+  y = _align(y, x)
+  out = _apply(f, x, y)
   if track_types:
     out = promoter.promote(out)
   return out
@@ -1454,14 +1710,17 @@ def in_(x, y, track_types = True, **kwargs):
   if track_types:
     promoter = TypePromoter(x, y, function = "in")
     promoter.check()
+  mask = _notnull_mask(x)
   def f(x, y):
     if isinstance(y, Interval):
-      a = np.greater_equal(x, y.lower)
-      b = np.less_equal(x, y.upper)
-      return np.where(pd.notnull(x), np.logical_and(a, b), np.nan)
+      # The second comparison is combined into the first one in place,
+      # which saves allocating a third array of the full size.
+      values = np.greater_equal(x, y.lower)
+      values &= np.less_equal(x, y.upper)
+      return _fill_nodata(values, x, mask = mask)
     else:
-      return np.where(pd.notnull(x), np.isin(x, y), np.nan)
-  out = xr.apply_ufunc(f, x, y, keep_attrs = True)
+      return _fill_nodata(utils.isin(x, y), x, mask = mask)
+  out = _apply(f, x, y)
   if track_types:
     out = promoter.promote(out)
   return out
@@ -1513,9 +1772,9 @@ def not_equal_(x, y, track_types = True, **kwargs):
   if track_types:
     promoter = TypePromoter(x, y, function = "not_equal")
     promoter.check()
-  f = lambda x, y: np.where(pd.notnull(x), np.not_equal(x, y), np.nan)
-  y = xr.DataArray(y).sq.align_with(x)
-  out = xr.apply_ufunc(f, x, y, keep_attrs = True)
+  f = partial(_masked, np.not_equal, mask = _notnull_mask(x))
+  y = _align(y, x)
+  out = _apply(f, x, y)
   if track_types:
     out = promoter.promote(out)
   return out
@@ -1563,14 +1822,15 @@ def not_in_(x, y, track_types = True, **kwargs):
   if track_types:
     promoter = TypePromoter(x, y, function = "not_in")
     promoter.check()
+  mask = _notnull_mask(x)
   def f(x, y):
     if isinstance(y, Interval):
-      a = np.less(x, y.lower)
-      b = np.greater(x, y.upper)
-      return np.where(pd.notnull(x), np.logical_or(a, b), np.nan)
+      values = np.less(x, y.lower)
+      values |= np.greater(x, y.upper)
+      return _fill_nodata(values, x, mask = mask)
     else:
-      return np.where(pd.notnull(x), np.isin(x, y, invert = True), np.nan)
-  out = xr.apply_ufunc(f, x, y, keep_attrs = True)
+      return _fill_nodata(np.logical_not(utils.isin(x, y)), x, mask = mask)
+  out = _apply(f, x, y)
   if track_types:
     out = promoter.promote(out)
   return out
@@ -1626,9 +1886,9 @@ def greater_(x, y, track_types = True, **kwargs):
   if track_types:
     promoter = TypePromoter(x, y, function = "greater")
     promoter.check()
-  f = lambda x, y: np.where(pd.notnull(x), np.greater(x, y), np.nan)
-  y = xr.DataArray(y).sq.align_with(x)
-  out = xr.apply_ufunc(f, x, y, keep_attrs = True)
+  f = partial(_masked, np.greater, mask = _notnull_mask(x))
+  y = _align(y, x)
+  out = _apply(f, x, y)
   if track_types:
     out = promoter.promote(out)
   return out
@@ -1680,9 +1940,9 @@ def greater_equal_(x, y, track_types = True, **kwargs):
   if track_types:
     promoter = TypePromoter(x, y, function = "greater_equal")
     promoter.check()
-  f = lambda x, y: np.where(pd.notnull(x), np.greater_equal(x, y), np.nan)
-  y = xr.DataArray(y).sq.align_with(x)
-  out = xr.apply_ufunc(f, x, y, keep_attrs = True)
+  f = partial(_masked, np.greater_equal, mask = _notnull_mask(x))
+  y = _align(y, x)
+  out = _apply(f, x, y)
   if track_types:
     out = promoter.promote(out)
   return out
@@ -1734,9 +1994,9 @@ def less_(x, y, track_types = True, **kwargs):
   if track_types:
     promoter = TypePromoter(x, y, function = "less")
     promoter.check()
-  f = lambda x, y: np.where(pd.notnull(x), np.less(x, y), np.nan)
-  y = xr.DataArray(y).sq.align_with(x)
-  out = xr.apply_ufunc(f, x, y, keep_attrs = True)
+  f = partial(_masked, np.less, mask = _notnull_mask(x))
+  y = _align(y, x)
+  out = _apply(f, x, y)
   if track_types:
     out = promoter.promote(out)
   return out
@@ -1788,9 +2048,9 @@ def less_equal_(x, y, track_types = True, **kwargs):
   if track_types:
     promoter = TypePromoter(x, y, function = "less_equal")
     promoter.check()
-  f = lambda x, y: np.where(pd.notnull(x), np.less_equal(x, y), np.nan)
-  y = xr.DataArray(y).sq.align_with(x)
-  out = xr.apply_ufunc(f, x, y, keep_attrs = True)
+  f = partial(_masked, np.less_equal, mask = _notnull_mask(x))
+  y = _align(y, x)
+  out = _apply(f, x, y)
   if track_types:
     out = promoter.promote(out)
   return out
@@ -1855,13 +2115,21 @@ def intersects_(x, y, track_types = True, **kwargs):
   if track_types:
     promoter = TypePromoter(x, y, function = "intersects")
     promoter.check()
+  cells = x.sq.stack_spatial_dims()[SPACE]
   try:
-    y = y.unary_union
+    geoms = np.asarray(y.geometry)
   except AttributeError:
-    y = y.sq.trim().sq.grid_points.envelope.unary_union
-  values = x.sq.grid_points.intersects(y).astype(int)
-  coords = x.sq.stack_spatial_dims()[SPACE].coords
-  out = xr.DataArray(values, coords = coords).sq.unstack_spatial_dims()
+    # Instead of testing each grid point against the union of all geometries,
+    # the spatial index of the geometries is queried with all points at once.
+    geoms = y.sq.trim().sq.grid_points.envelope
+    points = gpd.points_from_xy(cells[X], cells[Y], crs = x.sq.crs)
+    hits = geoms.sindex.query(points, predicate = "intersects")
+    values = np.zeros(len(points), dtype = int)
+    values[hits[0]] = 1
+  else:
+    grid = _intersects_grid(geoms, x[X].values, x[Y].values)
+    values = grid.ravel().astype(int)
+  out = xr.DataArray(values, coords = cells.coords).sq.unstack_spatial_dims()
   if track_types:
     out = promoter.promote(out)
   return out
@@ -1927,8 +2195,11 @@ def after_(x, y, track_types = True, **kwargs):
   if track_types:
     promoter = TypePromoter(x, y, function = "after")
     promoter.check()
-  f = lambda x, y: np.where(pd.notnull(x), np.greater(x, np.nanmax(y)), np.nan)
-  out = xr.apply_ufunc(f, x, y, keep_attrs = True)
+  mask = _notnull_mask(x)
+  _, upper = _bounds(y)
+  def f(x):
+    return _fill_nodata(np.greater(x, upper), x, mask = mask)
+  out = _apply(f, x)
   if track_types:
     out = promoter.promote(out)
   return out
@@ -1990,8 +2261,11 @@ def before_(x, y, track_types = True, **kwargs):
   if track_types:
     promoter = TypePromoter(x, y, function = "before")
     promoter.check()
-  f = lambda x, y: np.where(pd.notnull(x), np.less(x, np.nanmin(y)), np.nan)
-  out = xr.apply_ufunc(f, x, y, keep_attrs = True)
+  mask = _notnull_mask(x)
+  lower, _ = _bounds(y)
+  def f(x):
+    return _fill_nodata(np.less(x, lower), x, mask = mask)
+  out = _apply(f, x)
   if track_types:
     out = promoter.promote(out)
   return out
@@ -2050,11 +2324,27 @@ def during_(x, y, track_types = True, **kwargs):
   if track_types:
     promoter = TypePromoter(x, y, function = "during")
     promoter.check()
-  def f(x, y):
-    a = np.greater_equal(x, np.nanmin(y))
-    b = np.less_equal(x, np.nanmax(y))
-    return np.where(pd.notnull(x), np.logical_and(a, b), np.nan)
-  out = xr.apply_ufunc(f, x, y, keep_attrs = True)
+  mask = _notnull_mask(x)
+  bounds = _bounds(y)
+  def f(x):
+    lower, upper = bounds
+    # Bounds in another unit than x would have to be rounded to the unit of x
+    # before comparing them as integers. They are compared by numpy instead.
+    same_unit = x.dtype.kind == "M" and lower.dtype == upper.dtype == x.dtype
+    if same_unit and not (np.isnat(lower) or np.isnat(upper)):
+      # Timestamps can be compared as integers. Their offset from the lower
+      # bound is then tested with a single unsigned comparison, in which
+      # timestamps before the lower bound wrap around to very large offsets.
+      lower = int(lower.astype(np.int64))
+      upper = int(upper.astype(np.int64))
+      offset = np.subtract(x.view(np.int64), np.int64(lower))
+      values = np.less_equal(offset.view(np.uint64), np.uint64(upper - lower))
+    else:
+      a = np.greater_equal(x, lower)
+      b = np.less_equal(x, upper)
+      values = np.logical_and(a, b)
+    return _fill_nodata(values, x, mask = mask)
+  out = _apply(f, x)
   if track_types:
     out = promoter.promote(out)
   return out
@@ -2112,9 +2402,15 @@ def assign_(x, y, track_types = True, **kwargs):
   if track_types:
     promoter = TypePromoter(x, y, function = "assign")
     promoter.check()
-  f = lambda x, y: np.where(pd.notnull(x), y, utils.get_null(y))
-  y = xr.DataArray(y).sq.align_with(x)
-  out = xr.apply_ufunc(f, x, y, keep_attrs = True)
+  mask = _notnull_mask(x)
+  def f(x, y):
+    if mask is None or np.shape(mask) != np.shape(x):
+      valid = utils.notnull(x)
+    else:
+      valid = mask
+    return np.where(valid, y, utils.get_null(y))
+  y = _align(y, x)
+  out = _apply(f, x, y)
   if track_types:
     out = promoter.promote(out)
   return out
@@ -2171,9 +2467,9 @@ def assign_at_(x, y, z, track_types = True, **kwargs):
     promoter = TypePromoter(x, y, function = "assign_at")
     promoter.check()
   f = lambda x, y, z: np.where(np.logical_and(pd.notnull(z), z), y, x)
-  y = xr.DataArray(y).sq.align_with(x)
+  y = _align(y, x)
   z = z.sq.align_with(x)
-  out = xr.apply_ufunc(f, x, y, z, keep_attrs = True)
+  out = _apply(f, x, y, z)
   if track_types:
     out = promoter.promote(out)
   return out
@@ -1,4 +1,3 @@
-import pandas as pd
 import numpy as np
 
 from scipy import stats
@@ -6,6 +5,19 @@ from scipy import stats
 from semantique.processor import utils
 from semantique.processor.types import TypePromoter
 
+def _first(x, axis):
+  # Returns the first non-missing value along the given axis. The position of
+  # the first true element in the non-null mask is found with a single argmax
+  # for all columns at once. Where all values are missing, argmax gives the
+  # first position, which is then overwritten with nodata.
+  is_value = utils.notnull(x)
+  idx = np.expand_dims(np.argmax(is_value, axis = axis), axis)
+  values = np.squeeze(np.take_along_axis(x, idx, axis = axis), axis)
+  has_value = np.any(is_value, axis = axis)
+  if np.all(has_value):
+    return values
+  return np.where(has_value, values, utils.get_null(x))
+
 #
 # STATISTICAL REDUCERS
 #
@@ -337,7 +349,7 @@ def n_(x, track_types = True, **kwargs):
     promoter = TypePromoter(x, function = "n")
     promoter.check()
   def f(x, axis = None):
-    return np.nansum(pd.notnull(x), axis)
+    return np.sum(utils.notnull(x), axis)
   out = x.reduce(f, **kwargs)
   if track_types:
     out = promoter.promote(out)
@@ -772,7 +784,7 @@ def percentage_(x, track_types = True, **kwargs):
   def f(x, axis = None):
     part = np.count_nonzero(utils.null_as_zero(x), axis)
     part = np.where(utils.allnull(x, axis), np.nan, part)
-    whole = np.sum(pd.notnull(x), axis)
+    whole = np.sum(utils.notnull(x), axis)
     return np.multiply(np.divide(part, whole), 100)
   out = x.reduce(f, **kwargs)
   if track_types:
@@ -827,20 +839,9 @@ def first_(x, track_types = True, **kwargs):
   if track_types:
     promoter = TypePromoter(x, function = "first")
     promoter.check()
-  def get_first(col):
-    # The idea here is as follows:
-    # --> First mark non-missing values as True (i.e. 1).
-    # --> Then take twice the cumulative sum of this array.
-    # --> Only the first non-missing value will then be 1.
-    is_value = pd.notnull(col)
-    is_first = np.equal(np.cumsum(np.cumsum(is_value)), 1)
-    if any(is_first):
-      return col[np.argwhere(is_first)[0][0]]
-    else:
-      return utils.get_null(x)
   def f(x, axis = None):
     # Find the first non-missing value for each column along the dimension.
-    return np.apply_along_axis(get_first, axis, x)
+    return _first(x, axis)
   out = x.reduce(f, **kwargs)
   if track_types:
     out = promoter.promote(out)
@@ -890,22 +891,11 @@ def last_(x, track_types = True, **kwargs):
   if track_types:
     promoter = TypePromoter(x, function = "last")
     promoter.check()
-  def get_first(col):
-    # The idea here is as follows:
-    # --> First mark non-missing values as True (i.e. 1).
-    # --> Then take twice the cumulative sum of this array.
-    # --> Only the first non-missing value will then be 1.
-    is_value = pd.notnull(col)
-    is_first = np.equal(np.cumsum(np.cumsum(is_value)), 1)
-    if any(is_first):
-      return col[np.argwhere(is_first)[0][0]]
-    else:
-      return utils.get_null(x)
   def f(x, axis = None):
     # First flip the array such that last values become first values.
     # Then find the first non-missing value for each column along the dimension.
     xflipped = np.flip(x, axis)
-    return np.apply_along_axis(get_first, axis, xflipped)
+    return _first(xflipped, axis)
   out = x.reduce(f, **kwargs)
   if track_types:
     out = promoter.promote(out)
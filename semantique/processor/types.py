@@ -1,5 +1,7 @@
 import numpy as np
+import xarray as xr
 
+from functools import lru_cache
 from geopandas import GeoDataFrame
 from semantique import exceptions
 
@@ -497,17 +499,23 @@ def get_value_type(x):
     https://numpy.org/doc/stable/reference/arrays.dtypes.html
 
   """
-  try:
-    vtype = x.sq.value_type
-  except AttributeError:
+  if isinstance(x, xr.DataArray):
+    # The attribute is read directly instead of through the sq accessor. The
+    # operand is usually the output of a previous operation, and creating its
+    # accessor only for this purpose is relatively expensive.
+    vtype = x.attrs.get("value_type")
+  else:
     try:
-      vtype = x.obj.sq.value_type
+      vtype = x.sq.value_type
     except AttributeError:
-      if isinstance(x, GeoDataFrame):
-        vtype = "geometry"
-      else:
-        x = np.array(x)
-        vtype = None
+      try:
+        vtype = x.obj.sq.value_type
+      except AttributeError:
+        if isinstance(x, GeoDataFrame):
+          vtype = "geometry"
+        else:
+          x = np.array(x)
+          vtype = None
   if vtype is None:
     dtype = x.dtype.kind
     try:
@@ -540,6 +548,9 @@ def get_value_labels(x):
       :obj:`None`.
 
   """
+  if isinstance(x, xr.DataArray):
+    # Read directly from the attributes, see get_value_type.
+    return x.attrs.get("value_labels")
   try:
     vlabs = x.sq.value_labels
   except AttributeError:
@@ -549,6 +560,36 @@ def get_value_labels(x):
       vlabs = None
   return vlabs
 
+def _lookup_output_type(manual, intypes):
+  outtype = None
+  if len(intypes) == 1:
+    for x in intypes[0]:
+      try:
+        outtype = manual[x]
+        break
+      except KeyError:
+        continue
+  else:
+    if len(intypes[0]) == 1 and intypes[0][0] in intypes[1]:
+      try:
+        xtype = intypes[0][0]
+        outtype = manual[xtype][xtype]
+      except KeyError:
+        pass
+    if outtype is None:
+      combs = [(x, y) for x in intypes[0] for y in intypes[1]]
+      for ref in combs:
+        try:
+          outtype = manual[ref[0]][ref[1]]
+          break
+        except KeyError:
+          continue
+  return outtype
+
+@lru_cache(maxsize = None)
+def _lookup_builtin_output_type(function, intypes):
+  return _lookup_output_type(TYPE_PROMOTION_MANUALS[function], intypes)
+
 class TypePromoter:
   """Worker that takes care of promoting value types during an operation.
 
@@ -651,34 +692,22 @@ class TypePromoter:
 
     """
     intypes = self.input_types
-    outtype = None
     manual = self.manual
     if manual is None:
       raise ValueError(
         f"No type promotion manual defined for function '{self._function}'"
       )
-    if len(intypes) == 1:
-      for x in intypes[0]:
-        try:
-          outtype = manual[x]
-          break
-        except KeyError:
-          continue
+    # Lookups in the built-in manuals only depend on the operand value types.
+    # Hence, their outcome can be cached and reused by subsequent operations.
+    try:
+      key = tuple(tuple(x) for x in intypes)
+      hash(key)
+    except TypeError:
+      key = None
+    if key is not None and manual is TYPE_PROMOTION_MANUALS.get(self._function):
+      outtype = _lookup_builtin_output_type(self._function, key)
     else:
-      if len(intypes[0]) == 1 and intypes[0][0] in intypes[1]:
-        try:
-          xtype = intypes[0][0]
-          outtype = manual[xtype][xtype]
-        except KeyError:
-          pass
-      if outtype is None:
-        combs = [(x, y) for x in intypes[0] for y in intypes[1]]
-        for ref in combs:
-          try:
-            outtype = manual[ref[0]][ref[1]]
-            break
-          except KeyError:
-            continue
+      outtype = _lookup_output_type(manual, intypes)
     if outtype is None:
       raise exceptions.InvalidValueTypeError(
         f"Unsupported operand value type(s) for '{self._function}': {intypes}"
@@ -699,12 +728,16 @@ class TypePromoter:
         The same object with an updated value type property.
 
     """
+    # The attributes are set directly instead of through the sq accessor.
+    # The output is usually a new object, and creating its accessor only for
+    # this purpose is relatively expensive.
+    attrs = obj.attrs
     # Set type.
-    obj.sq.value_type = self.output_type
+    attrs["value_type"] = self.output_type
     # Set labels.
     labs = self.output_labels
     if labs is None:
-      del obj.sq.value_labels
+      attrs.pop("value_labels", None)
     else:
-      obj.sq.value_labels = labs
+      attrs["value_labels"] = labs
     return obj
\ No newline at end of file
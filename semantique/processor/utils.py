@@ -42,7 +42,48 @@ def allnull(x, axis):
     :obj:`numpy.array`
 
   """
-  return np.equal(np.sum(pd.notnull(x), axis = axis), 0)
+  return np.logical_not(np.any(notnull(x), axis = axis))
+
+def notnull(x):
+  """Test which elements in an array are not null.
+
+  This gives the same result as :func:`pandas.notnull`. For arrays of floats,
+  a value is tested against itself instead, which is considerably faster
+  since NaN is the only value that is not equal to itself.
+
+  Parameters
+  ----------
+    x : :obj:`xarray.DataArray` or :obj:`numpy.array`
+      The input array.
+
+  Return
+  -------
+    :obj:`numpy.array`
+
+  """
+  if np.asarray(x).dtype.kind == "f":
+    return np.equal(x, x)
+  return pd.notnull(x)
+
+def isnull(x):
+  """Test which elements in an array are null.
+
+  This gives the same result as :func:`pandas.isnull`. For arrays of floats,
+  a value is tested against itself instead, see :func:`notnull`.
+
+  Parameters
+  ----------
+    x : :obj:`xarray.DataArray` or :obj:`numpy.array`
+      The input array.
+
+  Return
+  -------
+    :obj:`numpy.array`
+
+  """
+  if np.asarray(x).dtype.kind == "f":
+    return np.not_equal(x, x)
+  return pd.isnull(x)
 
 def null_as_zero(x):
   """Convert all null values in an array to 0.
@@ -78,6 +119,69 @@ def inf_as_null(x):
     return x
   return np.where(is_inf, get_null(x), x)
 
+def isin(x, y):
+  """Test whether each value in an array is a member of a finite set.
+
+  This is a faster alternative to :func:`numpy.isin` for the small sets that
+  are commonly used in queries. Sets of up to 32 members are tested member by
+  member, while larger sets are sorted once and searched with a binary
+  search. For arrays of 8-bit or 16-bit integers, such as categorical
+  classification layers, sets of more than four members are instead turned
+  into a lookup table that is indexed directly by the values in the array.
+  Arrays or sets of objects, as well as sets that cannot be sorted or compared
+  with the values in the array, fall back to :func:`numpy.isin`.
+
+  Parameters
+  -----------
+    x : :obj:`xarray.DataArray` or :obj:`numpy.array`
+      The input array.
+    y : :obj:`list`
+      The members of the set.
+
+  Return
+  ------
+    :obj:`numpy.array`
+
+  """
+  try:
+    members = np.unique(np.asarray(y))
+  except TypeError:
+    return np.isin(x, y)
+  if members.size == 0:
+    return np.zeros(np.shape(x), dtype = bool)
+  dtype = np.asarray(x).dtype
+  if dtype.kind == "O" or members.dtype.kind == "O":
+    # Objects, including the None values used as nodata, may not be orderable.
+    return np.isin(x, y)
+  numeric = ["b", "i", "u", "f"]
+  if (members.dtype.kind in numeric) != (dtype.kind in numeric):
+    # Numbers never match non-numeric members, but cannot be compared to them.
+    return np.isin(x, y)
+  if dtype.kind in ["i", "u"] and dtype.itemsize <= 2 and members.size > 4:
+    # Members that are not representable in the integer type of the array
+    # can never match. The table is indexed by the bit pattern of the values.
+    info = np.iinfo(dtype)
+    members = members[(members >= info.min) & (members <= info.max)]
+    values = members.astype(dtype)
+    values = values[np.equal(values, members)]
+    unsigned = np.dtype(f"u{dtype.itemsize}")
+    table = np.zeros(1 << (8 * dtype.itemsize), dtype = bool)
+    table[values.view(unsigned)] = True
+    return table[np.asarray(x).view(unsigned)]
+  try:
+    if members.size <= 32:
+      out = np.equal(x, members[0])
+      for value in members[1:]:
+        out |= np.equal(x, value)
+      return out
+    idx = np.searchsorted(members, x)
+    np.minimum(idx, members.size - 1, out = idx)
+    return np.equal(members[idx], x)
+  except TypeError:
+    # Values that cannot be compared with the members, e.g. timestamps with
+    # strings, are left to numpy.isin.
+    return np.isin(x, y)
+
 def datetime64_as_unix(x):
   """Convert datetime64 values in an array to unix time values.
 
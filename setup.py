@@ -8,7 +8,7 @@ with open("README.md", encoding = "utf-8") as file:
 dependencies = [
   'datacube>=1.8',
   'geocube>=0.4.1',
-  'geopandas>=0.11',
+  'geopandas>=0.13',
   'numpy>=1.21',
   'pandas>=2.0',
   'planetary-computer',
@@ -20,6 +20,7 @@ dependencies = [
   'rioxarray>=0.14',
   'scipy>=1.11',
   'setuptools',
+  'shapely>=2.0',
   'stackstac>=0.5.0',
   'xarray>=0.20'
 ]
@@ -0,0 +1,353 @@
+import unittest
+import warnings
+
+import semantique as sq
+import geopandas as gpd
+import numpy as np
+import xarray as xr
+
+from semantique.processor import operators, reducers
+from shapely.geometry import box
+from xarray import testing
+
+o = np.nan
+
+class TestNot(unittest.TestCase):
+
+  def test_float(self):
+    x = xr.DataArray([[1, 0], [1, o]])
+    f = xr.DataArray([[0, 1], [0, o]])
+    self.assertIsNone(testing.assert_equal(operators.not_(x, track_types = False), f))
+
+  def test_bool(self):
+    x = xr.DataArray([[True, False], [True, True]])
+    f = xr.DataArray([[0.0, 1.0], [0.0, 0.0]])
+    self.assertIsNone(testing.assert_identical(operators.not_(x, track_types = False), f))
+
+  def test_modified_input(self):
+    # The filter verb modifies its filterer in place.
+    x = xr.DataArray([[1, 0], [o, 1]])
+    data = xr.DataArray([[1, 2], [3, 4]])
+    operators.not_(x, track_types = False)
+    data.sq.filter(x, track_types = False)
+    f = xr.DataArray([[0, 1], [1, 0]])
+    self.assertIsNone(testing.assert_equal(operators.not_(x, track_types = False), f))
+
+
+class TestIsMissing(unittest.TestCase):
+
+  def test_float(self):
+    x = xr.DataArray(np.array([[1, 0], [1, o]], dtype = "float32"))
+    f = xr.DataArray([[False, False], [False, True]])
+    out = operators.is_missing_(x, track_types = False)
+    self.assertIsNone(testing.assert_identical(out, f))
+
+  def test_datetime(self):
+    x = xr.DataArray(np.array(["2020-01-01", "NaT"], dtype = "datetime64[ns]"))
+    f = xr.DataArray([True, False])
+    out = operators.not_missing_(x, track_types = False)
+    self.assertIsNone(testing.assert_identical(out, f))
+
+
+class TestSquareRoot(unittest.TestCase):
+
+  def test_negative(self):
+    x = xr.DataArray([[4, -1], [9, o]])
+    f = xr.DataArray([[2, o], [3, o]])
+    with warnings.catch_warnings():
+      warnings.simplefilter("error")
+      out = operators.square_root_(x, track_types = False)
+    self.assertIsNone(testing.assert_equal(out, f))
+
+
+class TestAdd(unittest.TestCase):
+
+  def test_scalar(self):
+    x = xr.DataArray([[1, 2], [3, o]])
+    f = xr.DataArray([[3, 4], [5, o]])
+    self.assertIsNone(testing.assert_equal(operators.add_(x, 2), f))
+
+  def test_float32(self):
+    x = xr.DataArray(np.array([[1, 2], [3, o]], dtype = "float32"))
+    f = xr.DataArray(np.array([[3.5, 4.5], [5.5, o]], dtype = "float32"))
+    out = operators.add_(x, 2.5, track_types = False)
+    self.assertIsNone(testing.assert_identical(out, f))
+
+  def test_binary(self):
+    x = xr.DataArray([[True, False], [True, True]])
+    f = xr.DataArray([[2, 0], [2, 2]])
+    self.assertIsNone(testing.assert_equal(operators.add_(x, x), f))
+
+  def test_binary_precision(self):
+    x = xr.DataArray([[True, False], [True, True]])
+    for dtype in ["float32", "uint8"]:
+      y = xr.DataArray(np.array([[1, 2], [3, 4]], dtype = dtype))
+      f = xr.DataArray(np.array([[2, 2], [4, 5]], dtype = dtype))
+      out = operators.add_(x, y, track_types = False)
+      self.assertIsNone(testing.assert_identical(out, f))
+      self.assertEqual(out.dtype, f.dtype)
+
+  def test_zero(self):
+    x = xr.DataArray([[1, 2], [3, 4]])
+    out = operators.add_(x, 0, track_types = False)
+    self.assertIsNone(testing.assert_identical(out, x))
+    self.assertIsNot(out, x)
+
+  def test_align(self):
+    x = xr.DataArray([[1, 2], [3, o]], coords = {"foo": [0, 1], "bar": [0, 1]})
+    y = xr.DataArray([1, 2], coords = {"bar": [1, 0]})
+    f = xr.DataArray([[3, 3], [5, o]], coords = {"foo": [0, 1], "bar": [0, 1]})
+    self.assertIsNone(testing.assert_equal(operators.add_(x, y), f))
+
+
+class TestNormalizedDifference(unittest.TestCase):
+
+  def test_float(self):
+    x = xr.DataArray([[3, 1], [2, o]])
+    y = xr.DataArray([[1, 1], [0, 1]])
+    f = xr.DataArray([[0.5, 0], [1, o]])
+    out = operators.normalized_difference_(x, y, track_types = False)
+    self.assertIsNone(testing.assert_equal(out, f))
+
+  def test_integer(self):
+    x = xr.DataArray([[3, 1], [2, 4]])
+    f = xr.DataArray([[0.2, -1 / 3], [0, 1 / 3]])
+    out = operators.normalized_difference_(x, 2, track_types = False)
+    self.assertIsNone(testing.assert_allclose(out, f))
+
+
+class TestAnd(unittest.TestCase):
+
+  def test_same_input(self):
+    x = xr.DataArray([[1, 2], [3, o]])
+    a = operators.greater_(x, 1)
+    b = operators.less_(x, 3)
+    f = xr.DataArray([[0, 1], [0, o]])
+    self.assertIsNone(testing.assert_equal(operators.and_(a, b), f))
+    f = xr.DataArray([[0, 0], [1, o]])
+    self.assertIsNone(testing.assert_equal(operators.greater_(x, 2), f))
+
+  def test_missing_operand(self):
+    x = xr.DataArray([[1, 1], [0, o]])
+    y = xr.DataArray([[o, 2], [1, 1]])
+    f = xr.DataArray([[0, 1], [0, o]])
+    out = operators.and_(x, y, track_types = False)
+    self.assertIsNone(testing.assert_equal(out, f))
+
+  def test_bool(self):
+    x = xr.DataArray([[True, True], [False, True]])
+    y = xr.DataArray([[o, 2], [1, 0]])
+    f = xr.DataArray([[0.0, 1.0], [0.0, 0.0]])
+    out = operators.and_(x, y, track_types = False)
+    self.assertIsNone(testing.assert_identical(out, f))
+
+
+class TestPower(unittest.TestCase):
+
+  def test_integer_exponent(self):
+    x = xr.DataArray([[1, 2], [-3, o]])
+    f = xr.DataArray([[1, 8], [-27, o]])
+    self.assertIsNone(testing.assert_equal(operators.power_(x, 3), f))
+
+  def test_zero_exponent(self):
+    x = xr.DataArray([[1, 2], [-3, o]])
+    f = xr.DataArray([[1, 1], [1, 1]])
+    self.assertIsNone(testing.assert_equal(operators.power_(x, 0), f))
+
+  def test_float_exponent(self):
+    x = xr.DataArray([[1, 4], [9, o]])
+    f = xr.DataArray([[1, 2], [3, o]])
+    self.assertIsNone(testing.assert_equal(operators.power_(x, 0.5), f))
+
+
+class TestGreater(unittest.TestCase):
+
+  def test_scalar(self):
+    x = xr.DataArray([[1, 2], [3, o]])
+    f = xr.DataArray([[0, 0], [1, o]])
+    self.assertIsNone(testing.assert_equal(operators.greater_(x, 2), f))
+
+  def test_zero_dimensional(self):
+    x = xr.DataArray([[1, 2], [3, o]])
+    f = xr.DataArray([[0, 0], [1, o]])
+    y = xr.DataArray(2)
+    self.assertIsNone(testing.assert_equal(operators.greater_(x, y), f))
+
+  def test_float32(self):
+    x = xr.DataArray(np.array([[1, 2], [3, o]], dtype = "float32"))
+    f = xr.DataArray(np.array([[0, 0], [1, o]], dtype = "float32"))
+    out = operators.greater_(x, 2, track_types = False)
+    self.assertIsNone(testing.assert_identical(out, f))
+
+
+class TestChain(unittest.TestCase):
+
+  def setUp(self):
+    x = xr.DataArray([[1, 7], [8, 9]], dims = ["time", "x"])
+    self.x = operators.greater_(x, 6, track_types = False)
+
+  def test_mode(self):
+    f = xr.DataArray([0.0, 1.0], dims = ["x"])
+    out = reducers.mode_(self.x, track_types = False, dim = "time")
+    self.assertIsNone(testing.assert_equal(out, f))
+
+  def test_subtract(self):
+    f = xr.DataArray([[0.0, 0.0], [0.0, 0.0]], dims = ["time", "x"])
+    out = operators.subtract_(self.x, self.x, track_types = False)
+    self.assertIsNone(testing.assert_identical(out, f))
+
+  def test_shift(self):
+    shifted = self.x.sq.shift("time", 1)
+    self.assertEqual(shifted.dtype, np.float64)
+    f = xr.DataArray([0.0, 1.0], dims = ["x"])
+    out = reducers.sum_(shifted, track_types = False, dim = "time")
+    self.assertIsNone(testing.assert_identical(out, f))
+    self.assertEqual(out.dtype, np.float64)
+    f = xr.DataArray([[o, o], [0.0, 1.0]], dims = ["time", "x"])
+    out = operators.and_(shifted, self.x, track_types = False)
+    self.assertIsNone(testing.assert_identical(out, f))
+    self.assertEqual(out.dtype, np.float64)
+
+
+class TestEqual(unittest.TestCase):
+
+  def test_float(self):
+    x = xr.DataArray([[1, 2], [3, o]])
+    f = xr.DataArray([[0, 1], [0, o]])
+    self.assertIsNone(testing.assert_equal(operators.equal_(x, 2), f))
+
+  def test_integer(self):
+    x = xr.DataArray([[1, 2], [3, 4]])
+    f = xr.DataArray([[0.0, 1.0], [0.0, 0.0]])
+    out = operators.equal_(x, 2, track_types = False)
+    self.assertIsNone(testing.assert_identical(out, f))
+
+
+class TestIn(unittest.TestCase):
+
+  def test_small_set(self):
+    x = xr.DataArray([[1, 2], [3, o]])
+    f = xr.DataArray([[1, 0], [1, o]])
+    self.assertIsNone(testing.assert_equal(operators.in_(x, [1, 3]), f))
+
+  def test_large_set(self):
+    x = xr.DataArray([[1, 2], [30, o]])
+    f = xr.DataArray([[0, 1], [1, o]])
+    y = list(range(0, 40, 2))
+    self.assertIsNone(testing.assert_equal(operators.in_(x, y), f))
+
+  def test_sorted_set(self):
+    x = xr.DataArray([[1, 2], [98, o]])
+    f = xr.DataArray([[0, 1], [1, o]])
+    y = list(range(100, -1, -2))
+    self.assertIsNone(testing.assert_equal(operators.in_(x, y), f))
+
+  def test_small_integers(self):
+    x = xr.DataArray(np.array([[1, 2], [30, 255]], dtype = "uint8"))
+    f = xr.DataArray([[0, 1], [1, 0]])
+    y = list(range(-40, 40, 2)) + [1.5, 1000]
+    out = operators.in_(x, y, track_types = False)
+    self.assertIsNone(testing.assert_equal(out.astype(int), f))
+
+  def test_empty_set(self):
+    x = xr.DataArray([[1, 2], [3, o]])
+    f = xr.DataArray([[0, 0], [0, o]])
+    self.assertIsNone(testing.assert_equal(operators.in_(x, []), f))
+
+  def test_interval(self):
+    x = xr.DataArray([[1, 2], [3, o]])
+    f = xr.DataArray([[0, 1], [1, o]])
+    y = sq.processor.values.Interval(2, 3)
+    self.assertIsNone(testing.assert_equal(operators.in_(x, y), f))
+
+  def test_objects(self):
+    x = xr.DataArray(np.array(["a", None, "c"], dtype = object))
+    f = xr.DataArray([1, o, 0])
+    y = ["a"] + [str(i) for i in range(40)]
+    self.assertIsNone(testing.assert_equal(operators.in_(x, y, track_types = False), f))
+
+  def test_incomparable(self):
+    x = xr.DataArray(np.array(["2020-01-01", "NaT"], dtype = "datetime64[ns]"))
+    f = xr.DataArray([0, o])
+    out = operators.in_(x, ["2020-01-01"], track_types = False)
+    self.assertIsNone(testing.assert_equal(out, f))
+
+  def test_dask(self):
+    x = xr.DataArray([[1, 2], [3, o]]).chunk({"dim_0": 1})
+    f = xr.DataArray([[1, 0], [1, o]])
+    out = operators.in_(x, [1, 3])
+    self.assertIsNotNone(out.chunks)
+    self.assertIsNone(testing.assert_equal(out.compute(), f))
+
+
+class TestNotIn(unittest.TestCase):
+
+  def test_small_set(self):
+    x = xr.DataArray([[1, 2], [3, o]])
+    f = xr.DataArray([[0, 1], [0, o]])
+    self.assertIsNone(testing.assert_equal(operators.not_in_(x, [1, 3]), f))
+
+  def test_large_set(self):
+    x = xr.DataArray([[1, 2], [30, o]])
+    f = xr.DataArray([[1, 0], [0, o]])
+    y = list(range(0, 40, 2))
+    self.assertIsNone(testing.assert_equal(operators.not_in_(x, y), f))
+
+  def test_objects(self):
+    x = xr.DataArray(np.array(["a", None, "c"], dtype = object))
+    f = xr.DataArray([0, o, 1])
+    y = ["a"] + [str(i) for i in range(40)]
+    out = operators.not_in_(x, y, track_types = False)
+    self.assertIsNone(testing.assert_equal(out, f))
+
+
+class TestDuring(unittest.TestCase):
+
+  def test_interval(self):
+    dates = ["2019-12-31", "2020-01-01", "2020-06-01", "2021-01-01", "NaT"]
+    x = xr.DataArray(np.array(dates, dtype = "datetime64[ns]"))
+    y = np.array(["2020-01-01", "2020-12-31"], dtype = "datetime64[ns]")
+    f = xr.DataArray([0, 1, 1, 0, o])
+    self.assertIsNone(testing.assert_equal(operators.during_(x, y), f))
+
+  def test_units(self):
+    dates = ["2020-01-01T00:00:00", "2020-01-01T00:00:01", "2020-01-01T00:00:02"]
+    x = xr.DataArray(np.array(dates, dtype = "datetime64[s]"))
+    bounds = ["2020-01-01T00:00:00.500", "2020-01-01T00:00:01.500"]
+    y = np.array(bounds, dtype = "datetime64[ms]")
+    f = xr.DataArray([0, 1, 0])
+    out = operators.during_(x, y, track_types = False)
+    self.assertIsNone(testing.assert_equal(out, f))
+
+  def test_dask(self):
+    dates = ["2019-12-31", "2020-01-01", "2020-06-01", "2021-01-01", "NaT"]
+    x = xr.DataArray(np.array(dates, dtype = "datetime64[ns]")).chunk(2)
+    y = np.array(["2020-01-01", "2020-12-31"], dtype = "datetime64[ns]")
+    f = xr.DataArray([0, 1, 1, 0, o])
+    out = operators.during_(x, y, track_types = False)
+    self.assertIsNotNone(out.chunks)
+    self.assertIsNone(testing.assert_equal(out.compute(), f))
+
+
+class TestIntersects(unittest.TestCase):
+
+  def test_geometries(self):
+    coords = {"y": [30, 20, 10], "x": [10, 20, 30, 40]}
+    x = xr.DataArray(np.zeros((3, 4)), coords = coords).rio.write_crs(3035)
+    y = gpd.GeoDataFrame(geometry = [box(15, 15, 30, 30)], crs = 3035)
+    f = xr.DataArray([[0, 1, 1, 0], [0, 1, 1, 0], [0, 0, 0, 0]], coords = coords)
+    out = operators.intersects_(x, y, track_types = False)
+    self.assertIsNone(testing.assert_equal(out.drop_vars("spatial_ref"), f))
+
+  def test_reduce(self):
+    coords = {"y": [30, 20, 10], "x": [10, 20, 30, 40]}
+    x = xr.DataArray(np.zeros((3, 4)), coords = coords).rio.write_crs(3035)
+    y = gpd.GeoDataFrame(geometry = [box(15, 15, 40, 30)], crs = 3035)
+    out = operators.intersects_(x, y, track_types = False)
+    self.assertEqual(out.sq.shift("x", 1).dtype, np.float64)
+    f = xr.DataArray([1, 1, 0], coords = {"y": coords["y"]})
+    out = reducers.mode_(out, track_types = False, dim = "x")
+    self.assertIsNone(testing.assert_equal(out.drop_vars("spatial_ref"), f))
+
+if __name__ == "__main__":
+  unittest.main()
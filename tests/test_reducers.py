@@ -0,0 +1,51 @@
+import unittest
+
+import numpy as np
+import xarray as xr
+
+from semantique.processor import reducers
+from xarray import testing
+
+o = np.nan
+
+class TestFirst(unittest.TestCase):
+
+  def test_float(self):
+    x = xr.DataArray([[o, 2, o], [3, 4, o], [5, 6, o]], dims = ["time", "x"])
+    f = xr.DataArray([3, 2, o], dims = ["x"])
+    out = reducers.first_(x, track_types = False, dim = "time")
+    self.assertIsNone(testing.assert_equal(out, f))
+
+  def test_integer(self):
+    x = xr.DataArray([[1, 2], [3, 4]], dims = ["time", "x"])
+    f = xr.DataArray([1, 3], dims = ["time"])
+    out = reducers.first_(x, track_types = False, dim = "x")
+    self.assertIsNone(testing.assert_identical(out, f))
+
+  def test_datetime(self):
+    dates = [["NaT", "NaT"], ["2020-01-01", "NaT"]]
+    x = xr.DataArray(np.array(dates, dtype = "datetime64[ns]"), dims = ["time", "x"])
+    f = xr.DataArray(np.array(["2020-01-01", "NaT"], dtype = "datetime64[ns]"), dims = ["x"])
+    out = reducers.first_(x, track_types = False, dim = "time")
+    self.assertIsNone(testing.assert_identical(out, f))
+
+
+class TestLast(unittest.TestCase):
+
+  def test_float(self):
+    x = xr.DataArray([[o, 2, o], [3, 4, o], [5, o, o]], dims = ["time", "x"])
+    f = xr.DataArray([5, 4, o], dims = ["x"])
+    out = reducers.last_(x, track_types = False, dim = "time")
+    self.assertIsNone(testing.assert_equal(out, f))
+
+
+class TestSum(unittest.TestCase):
+
+  def test_all_missing(self):
+    x = xr.DataArray([[o, 2], [o, 4]], dims = ["time", "x"])
+    f = xr.DataArray([o, 6], dims = ["x"])
+    out = reducers.sum_(x, track_types = False, dim = "time")
+    self.assertIsNone(testing.assert_equal(out, f))
+
+if __name__ == "__main__":
+  unittest.main()